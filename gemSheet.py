@@ -1,311 +1,292 @@
-from enum import Enum
-from typing import Self, Any
-from string import ascii_letters, digits
+import re
+import sys
+from bisect import bisect_left
+from enum import IntEnum
+from typing import Self, Any, Iterator, NamedTuple
+
+
+# One match per token: group 1 swallows the whitespace in front of it, then
+# one named alternative per token type, with anything else falling through
+# to ERROR. Trailing whitespace simply produces no match.
+TOKEN_PATTERN: re.Pattern[str] = re.compile(
+	r"""
+	([ \t\n]*)
+	(?:
+		\#(?P<ID>[A-Za-z0-9_\-]*)
+		| \.(?P<CLASS>[A-Za-z0-9_\-]*)
+		| (?P<IDENTIFIER>[A-Za-z0-9][A-Za-z0-9_\-]*)
+		| (?P<LBR>\{)
+		| (?P<RBR>\})
+		| (?P<COL>:)
+		| (?P<SEMICOL>;)
+		| (?P<ERROR>[^ \t\n])
+	)
+	""",
+	re.VERBOSE,
+)
+
+
+class TT(IntEnum):
+	EOF = 0
+	LBR = 1
+	RBR = 2
+	COL = 3
+	SEMICOL = 4
+	IDENTIFIER = 5
+	VALUE = 6
+	CLASS = 7
+	ID = 8
+
+	def __str__(self) -> str:
+		return self.name
+
+
+# Tokens carry the plain int value of their TT so that type checks are
+# exact int comparisons rather than going through the enum.
+EOF, LBR, RBR, COL, SEMICOL, IDENTIFIER, _, CLASS, ID = (tt.value for tt in TT)
+
+# Token type for each group number in TOKEN_PATTERN (as given by
+# Match.lastindex), or -1 for ERROR and the leading whitespace group.
+GROUP_TYPES: list[int] = [-1] * (TOKEN_PATTERN.groups + 1)
+for _name, _group in TOKEN_PATTERN.groupindex.items():
+	if _name != "ERROR":
+		GROUP_TYPES[_group] = TT[_name].value
+VALUED_TYPES: tuple[int, ...] = (ID, CLASS, IDENTIFIER)
+
+
+class Position(NamedTuple):
+	idx: int
+	ln: int
+	col: int
+
+
+class Source:
+	# File name and text shared by every Position from one parse.
+	__slots__ = ("fn", "ftxt", "newlines")
 
+	def __init__(self, fn: str, ftxt: str):
+		self.fn: str = fn
+		self.ftxt: str = ftxt
+		# Offsets of every newline, so line/column can be derived from an index.
+		# Only built once something actually asks for a Position.
+		self.newlines: list[int] | None = None
 
-LETTERS: str = ascii_letters
-LETTERS_DIGITS: str = ascii_letters + digits
-
-
-class TT(Enum):
-	EOF, LBR, RBR, COL, SEMICOL, IDENTIFIER, VALUE, CLASS, ID = range(9)
-
-	def __str__(self):
-		return super().__str__().replace("TT.", "")
+	def position(self, idx: int) -> Position:
+		if self.newlines is None:
+			self.newlines = [match.start() for match in re.finditer("\n", self.ftxt)]
+		ln: int = bisect_left(self.newlines, idx)
+		col: int = idx - self.newlines[ln - 1] - 1 if ln else idx
+		return Position(idx, ln, col)
 
 
-class Position:
-	def __init__(self, idx, ln, col, fn, ftxt):
-		self.idx = idx
-		self.ln = ln
-		self.col = col
-		self.fn = fn
-		self.ftxt = ftxt
+class Token(NamedTuple):
+	# Tokens only carry source offsets; Source.position turns them into a
+	# Position when an error needs one.
+	type: int
+	start: int
+	end: int
+	value: str = ""
 
-	def advance(self, current_char):
-		self.idx += 1
-		self.col += 1
-		if current_char == "\n":
-			self.col = 0
-			self.ln += 1
+	def __repr__(self) -> str:
+		token_type: TT = TT(self.type)
+		return f"{token_type}:'{self.value}'" if self.value else f"{token_type}"
 
-	def copy(self):
-		return Position(self.idx, self.ln, self.col, self.fn, self.ftxt)
 
+class Error:
+	__slots__ = ("source", "start_pos", "end_pos", "name", "details")
 
-class Token:
 	def __init__(
-		self, start_pos: Position, end_pos: Position, type: TT, value: str = ""
+		self,
+		source: Source,
+		start_pos: Position,
+		end_pos: Position,
+		name: str,
+		details: str,
 	):
-		self.start_pos = start_pos
-		self.end_pos = end_pos
-		self.type = type
-		self.value = value
-
-	def __repr__(self):
-		return f"{self.type}:'{self.value}'" if self.value else f"{self.type}"
-
-	def __eq__(self, value):
-		if not isinstance(value, Token):
-			return False
-		return self.type == value.type and self.value == value.value
-
-	def __ne__(self, value):
-		return not (self.__eq__(value))
-
-
-class Error:
-	def __init__(self, start_pos: Position, end_pos: Position, name: str, details: str):
+		self.source = source
 		self.start_pos = start_pos
 		self.end_pos = end_pos
 		self.name = name
 		self.details = details
 
-	def __repr__(self):
-		return f"File {self.start_pos.fn} (line {self.start_pos.ln + 1} column {self.start_pos.col + 1})\n\n{self.name}: {self.details}"
+	def __repr__(self) -> str:
+		return f"File {self.source.fn} (line {self.start_pos.ln + 1} column {self.start_pos.col + 1})\n\n{self.name}: {self.details}"
 
 
 class ExpectedCharacter(Error):
-	def __init__(self, start_pos: Position, end_pos: Position, details: str):
-		super().__init__(start_pos, end_pos, "ExpectedCharacter", details)
+	__slots__ = ()
+
+	def __init__(
+		self, source: Source, start_pos: Position, end_pos: Position, details: str
+	):
+		super().__init__(source, start_pos, end_pos, "ExpectedCharacter", details)
 
 
 class UnexpectedCharacter(Error):
-	def __init__(self, start_pos: Position, end_pos: Position, details: str):
-		super().__init__(start_pos, end_pos, "UnexpectedCharacter", details)
+	__slots__ = ()
+
+	def __init__(
+		self, source: Source, start_pos: Position, end_pos: Position, details: str
+	):
+		super().__init__(source, start_pos, end_pos, "UnexpectedCharacter", details)
 
 
 class InvalidSyntax(Error):
-	def __init__(self, start_pos: Position, end_pos: Position, details: str):
-		super().__init__(start_pos, end_pos, "InvalidSyntax", details)
+	__slots__ = ()
+
+	def __init__(
+		self, source: Source, start_pos: Position, end_pos: Position, details: str
+	):
+		super().__init__(source, start_pos, end_pos, "InvalidSyntax", details)
+
+
+class ParseError(Exception):
+	"""Raised by the Lexer or Parser to abort the parse with an Error."""
+
+	def __init__(self, error: Error):
+		super().__init__(error)
+		self.error = error
 
 
 class Result:
-	def __init__(self):
-		self.value = None
-		self.error: Error | None = None
+	__slots__ = ("value", "error")
 
-	def register(self, res: Self):
-		if res.error:
-			self.error = res.error
-		return res.value
+	def __init__(self) -> None:
+		self.value: Any = None
+		self.error: Error | None = None
 
-	def success(self, value):
+	def success(self, value: Any) -> Self:
 		self.value = value
 		return self
 
-	def fail(self, error: Error):
+	def fail(self, error: Error) -> Self:
 		self.error = error
 		return self
 
 
 class Lexer:
 	def __init__(self, fn: str, ftxt: str):
-		self.fn = fn
-		self.ftxt = ftxt
-
-		self.pos = Position(-1, 0, -1, fn, ftxt)
-		self.current_char: str | None = None
-		self.advance()
-
-	def advance(self):
-		self.pos.advance(self.current_char)
-		self.current_char = (
-			self.ftxt[self.pos.idx] if self.pos.idx < len(self.ftxt) else None
-		)
-
-	def skip_whitespace(self):
-		while self.current_char is not None and self.current_char in " \t\n":
-			self.advance()
-
-	def lex_special(self, token_type: TT, start_pos: Position):
-		name: str = ""
-		while (
-			self.current_char is not None and self.current_char in LETTERS_DIGITS + "_-"
-		):
-			name += self.current_char
-			self.advance()
-		return Token(start_pos, self.pos.copy(), token_type, name)
-
-	def lex(self):
-		tokens: list[Token] = []
-		res = Result()
-
-		while self.current_char is not None:
-			start_pos: Position = self.pos.copy()
-
-			if self.current_char in " \t\n":
-				self.skip_whitespace()
+		self.source: Source = Source(fn, ftxt)
+
+	def lex(self) -> Iterator[Token]:
+		# Tokens are produced on demand for the Parser; the full token list is
+		# never materialised.
+		# Every token is built with tuple.__new__ directly: Token(...) runs the
+		# NamedTuple's Python-level __new__, which measured about twice as slow
+		# per token (~460ns vs ~220ns) and ~15% of total lexing time.
+		new_token = tuple.__new__
+		intern = sys.intern
+
+		ftxt: str = self.source.ftxt
+		for match in TOKEN_PATTERN.finditer(ftxt):
+			group: int | None = match.lastindex
+			# Group 1 (the leading whitespace) always participates, so there is
+			# always a last group.
+			assert group is not None
+			token_type: int = GROUP_TYPES[group]
+			start: int = match.end(1)
+
+			if token_type in VALUED_TYPES:
+				# Names repeat across rules; interning makes later dict keys and
+				# comparisons hit the identity fast path.
+				value: str = intern(match[group])
+				yield new_token(Token, (token_type, start, match.end(), value))
+			elif token_type >= 0:
+				# Single-character tokens start and end at the same offset.
+				yield new_token(Token, (token_type, start, start, ""))
+			else:
+				pos: Position = self.source.position(start)
+				raise ParseError(
+					UnexpectedCharacter(self.source, pos, pos, f"'{match[group]}'")
+				)
 
-			elif self.current_char == "#":
-				self.advance()
-				tokens.append(self.lex_special(TT.ID, start_pos))
+		end: int = len(ftxt)
+		yield new_token(Token, (EOF, end, end, ""))
 
-			elif self.current_char == ".":
-				self.advance()
-				tokens.append(self.lex_special(TT.CLASS, start_pos))
 
-			elif self.current_char == "{":
-				tokens.append(Token(start_pos, self.pos.copy(), TT.LBR))
-				self.advance()
+class Parser:
+	def __init__(self, tokens: Iterator[Token], source: Source):
+		self.tokens: Iterator[Token] = tokens
+		self.source: Source = source
+
+	def syntax_error(self, tok: Token, details: str) -> ParseError:
+		start_pos: Position = self.source.position(tok.start)
+		end_pos: Position = self.source.position(tok.end)
+		return ParseError(InvalidSyntax(self.source, start_pos, end_pos, details))
+
+	def parse(self) -> dict[str, dict[str, list[str]]]:
+		# The grammar is small and fixed, so it is inlined into one loop over
+		# local variables rather than split across methods:
+		#   rule := selector+ "{" (IDENTIFIER ":" IDENTIFIER+ ";")* "}"
+		# The lexer always ends the stream with EOF, and nothing below
+		# advances past it.
+		next_tok = self.tokens.__next__
+		rules: dict[str, dict[str, list[str]]] = {}
+
+		tok: Token = next_tok()
+		tt: int = tok.type
+		while tt != EOF:
+			selectors: list[str] = []
+			while tt == CLASS or tt == ID or tt == IDENTIFIER:
+				prefix: str = "." if tt == CLASS else "#" if tt == ID else ""
+				selectors.append(prefix + tok.value)
+				tok = next_tok()
+				tt = tok.type
+
+			if tt != LBR:
+				raise self.syntax_error(tok, "Expected '{' after selectors.")
+			tok = next_tok()
+			tt = tok.type
+
+			if not selectors:
+				raise self.syntax_error(
+					tok, "Expected selectors (tags, IDs, or classes) before '{'."
+				)
 
-			elif self.current_char == "}":
-				tokens.append(Token(start_pos, self.pos.copy(), TT.RBR))
-				self.advance()
+			declarations: dict[str, list[str]] = {}
+			while tt != RBR and tt != EOF:
+				if tt != IDENTIFIER:
+					raise self.syntax_error(tok, "Expected a property.")
+				prop_key: str = tok.value
 
-			elif self.current_char == ":":
-				tokens.append(Token(start_pos, self.pos.copy(), TT.COL))
-				self.advance()
+				tok = next_tok()
+				if tok.type != COL:
+					raise self.syntax_error(tok, "Expected ':' after property.")
 
-			elif self.current_char == ";":
-				tokens.append(Token(start_pos, self.pos.copy(), TT.SEMICOL))
-				self.advance()
+				values: list[str] = []
+				tok = next_tok()
+				while tok.type == IDENTIFIER:
+					values.append(tok.value)
+					tok = next_tok()
 
-			elif self.current_char in LETTERS_DIGITS:
-				tokens.append(self.lex_special(TT.IDENTIFIER, start_pos))
+				if not values:
+					raise self.syntax_error(tok, "Expected values after ':'.")
 
-			else:
-				return res.fail(
-					UnexpectedCharacter(
-						self.pos.copy(), self.pos.copy(), f"'{self.current_char}'"
-					)
-				)
+				if tok.type != SEMICOL:
+					raise self.syntax_error(tok, "Expected ';' after values.")
+				tok = next_tok()
+				tt = tok.type
 
-		tokens.append(Token(self.pos.copy(), self.pos.copy(), TT.EOF))
-		return res.success(tokens)
+				declarations[prop_key] = values
 
+			if tt != RBR:
+				raise self.syntax_error(tok, "Expected '}' after block.")
+			tok = next_tok()
+			tt = tok.type
 
-class Parser:
-	def __init__(self, tokens: list[Token]):
-		self.tokens = tokens
-		self.idx = 0
-		self.current_tok = tokens[self.idx]
-
-	def advance(self):
-		self.idx += 1
-		if self.idx < len(self.tokens):
-			self.current_tok = self.tokens[self.idx]
-		return self.current_tok
-
-	def parse(self):
-		res = Result()
-		rules: dict = {}
-		while self.current_tok.type != TT.EOF:
-			selectors = res.register(self.parse_selectors())
-			if res.error:
-				return res
-			declarations = res.register(self.parse_block())
-			if res.error:
-				return res
-			rules[selectors] = declarations
-		return res.success(rules)
-
-	def parse_selectors(self):
-		res = Result()
-		selectors = []
-
-		while self.current_tok.type in (TT.CLASS, TT.ID, TT.IDENTIFIER):
-			prefix: str = (
-				"."
-				if self.current_tok.type == TT.CLASS
-				else "#" if self.current_tok.type == TT.ID else ""
-			)
-			value: str = prefix + self.current_tok.value
-			selectors.append(value)
-			self.advance()
-
-		if self.current_tok.type != TT.LBR:
-			return res.fail(
-				InvalidSyntax(
-					self.current_tok.start_pos,
-					self.current_tok.end_pos,
-					"Expected '{' after selectors.",
-				)
-			)
-		self.advance()
-
-		if not selectors:
-			return res.fail(
-				InvalidSyntax(
-					self.current_tok.start_pos,
-					self.current_tok.end_pos,
-					"Expected selectors (tags, IDs, or classes) before '{'."
-				)
-			)
-		
-		return res.success(" ".join(selectors))
-
-	def parse_block(self):
-		res = Result()
-		declarations: dict[str, list[str]] = {}
-
-		while self.current_tok.type not in (TT.RBR, TT.EOF):
-			if self.current_tok.type != TT.IDENTIFIER:
-				return res.fail(
-					InvalidSyntax(
-						self.current_tok.start_pos,
-						self.current_tok.end_pos,
-						"Expected a property."
-					)
-				)
-			prop_key: str = self.current_tok.value
-			self.advance()
-
-			if self.current_tok.type != TT.COL:
-				return res.fail(
-					InvalidSyntax(
-						self.current_tok.start_pos,
-						self.current_tok.end_pos,
-						"Expected ':' after property."
-					)
-				)
-			self.advance()
-
-			values: list[str] = []
-			while self.current_tok.type == TT.IDENTIFIER:
-				values.append(self.current_tok.value)
-				self.advance()
-			
-			if not values:
-				return res.fail(
-					InvalidSyntax(
-						self.current_tok.start_pos,
-						self.current_tok.end_pos,
-						"Expected values after ':'."
-					)
-				)
-			
-			if self.current_tok.type != TT.SEMICOL:
-				return res.fail(
-					InvalidSyntax(
-						self.current_tok.start_pos,
-						self.current_tok.end_pos,
-						"Expected ';' after values."
-					)
-				)
-			self.advance()
+			rules[sys.intern(" ".join(selectors))] = declarations
 
-			declarations[prop_key] = values
-		
-		if self.current_tok.type != TT.RBR:
-			return res.fail(InvalidSyntax(
-				self.current_tok.start_pos,
-				self.current_tok.end_pos,
-				"Expected '}' after block."
-			))
-		self.advance()		
-		return res.success(declarations)
+		return rules
 
 
-def parse_stylesheet(fn: str, ftxt: str):
+def parse_stylesheet(fn: str, ftxt: str) -> Result:
 	lexer = Lexer(fn, ftxt)
-	lex_result = lexer.lex()
-	if lex_result.error:
-		return lex_result
-
-	parser = Parser(lex_result.value)
-	rules = parser.parse()
-	return rules
+	res = Result()
+	try:
+		parser = Parser(lexer.lex(), lexer.source)
+		return res.success(parser.parse())
+	except ParseError as e:
+		return res.fail(e.error)
 
 
 if __name__ == "__main__":
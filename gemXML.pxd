@@ -0,0 +1,3 @@
+cdef class Lexer:
+	cdef public str fn, ftxt, current_char
+	cdef public Py_ssize_t end, idx, ln, col
@@ -1,12 +1,26 @@
+import re
 from enum import Enum
-from typing import Self, Any
-from string import ascii_letters, digits
+from typing import Any, NamedTuple
+from string import ascii_letters
 from os.path import exists
 from gemSheet import parse_stylesheet
 
 
-LETTERS: str = ascii_letters
-LETTERS_DIGITS: str = ascii_letters + digits
+LETTERS: frozenset[str] = frozenset(ascii_letters)
+WHITESPACE: frozenset[str] = frozenset(" \t\n")
+# current_char past the end of the text; never a member of the sets above.
+EOF_CHAR: str = "\0"
+
+# Runs of characters the lexer consumes in one step, scanned by the regex
+# engine rather than one advance() per character.
+WHITESPACE_RUN: re.Pattern = re.compile(r"[ \t\n]*")
+INLINE_WHITESPACE_RUN: re.Pattern = re.compile(r"[ \t]*")
+TAG_NAME_RUN: re.Pattern = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+ATTRIBUTE_RUN: re.Pattern = re.compile(r"[A-Za-z]*")
+STRING_RUN: re.Pattern = re.compile(r'[^"\n]*')
+ASTERISK_RUN: re.Pattern = re.compile(r"[^*\n]*")
+LINE_RUN: re.Pattern = re.compile(r"[^\n]*")
+TEXT_RUN: re.Pattern = re.compile(r"[^\n<>\"']*")
 
 VALID_TAGS = [
 	"window",
@@ -25,59 +39,48 @@ VALID_TAGS = [
 	"u",
 ]
 VALID_INCLUDES = ["style", "md"]
+# Tags produced by a run of 1, 2 or 3 markdown markers.
+HASH_MDS = ("h1", "h2", "h3")
+ASTERISK_MDS = ("i", "b", "bi")
 
 CLASSES: dict[str, list] = {}
 IDS: dict[str, Any] = {}
+# Reverse indexes kept alongside CLASSES and IDS: the object owning each ID,
+# and the class names of each object (keyed by id(obj)).
+ID_NAMES: dict[str, Any] = {}
+NODE_CLASSES: dict[int, list[str]] = {}
 
 
 class TT(Enum):
-	EOF, TAG, CLOSE, TEXT, DATA, ATTRIBUTE = range(6)
+	EOF, TAG, CLOSE, TEXT, DATA = range(5)
 
 	def __str__(self):
 		return super().__str__().replace("TT.", "")
 
 
-class Position:
-	def __init__(self, idx, ln, col, fn, ftxt):
-		self.idx = idx
-		self.ln = ln
-		self.col = col
-		self.fn = fn
-		self.ftxt = ftxt
-
-	def advance(self, current_char):
-		self.idx += 1
-		self.col += 1
-		if current_char == "\n":
-			self.col = 0
-			self.ln += 1
-
-	def copy(self):
-		return Position(self.idx, self.ln, self.col, self.fn, self.ftxt)
+class Position(NamedTuple):
+	idx: int
+	ln: int
+	col: int
+	fn: str
+	ftxt: str
 
 
-class Token:
-	def __init__(
-		self, start_pos: Position, end_pos: Position, type: TT, value: str = ""
-	):
-		self.start_pos = start_pos
-		self.end_pos = end_pos
-		self.type = type
-		self.value = value
+class Token(NamedTuple):
+	start_pos: Position
+	end_pos: Position
+	type: TT
+	value: str = ""
+	# Attribute name -> value, for TAG tokens lexed from '<tag ...>'.
+	attributes: dict[str, str] | None = None
 
 	def __repr__(self):
 		return f"{self.type}:'{self.value}'" if self.value else f"{self.type}"
 
-	def __eq__(self, value):
-		if not isinstance(value, Token):
-			return False
-		return self.type == value.type and self.value == value.value
-
-	def __ne__(self, value):
-		return not (self.__eq__(value))
-
 
 class Error:
+	__slots__ = ("start_pos", "end_pos", "name", "details")
+
 	def __init__(self, start_pos: Position, end_pos: Position, name: str, details: str):
 		self.start_pos = start_pos
 		self.end_pos = end_pos
@@ -89,40 +92,53 @@ class Error:
 
 
 class ExpectedCharacter(Error):
-	def __init__(self, start_pos: Position, end_pos: Position, details: str):
-		super().__init__(start_pos, end_pos, "ExpectedCharacter", details)
+	__slots__ = ()
+
+	def __init__(self, pos: Position, details: str):
+		super().__init__(pos, pos, "ExpectedCharacter", details)
 
 
 class UnexpectedCharacter(Error):
-	def __init__(self, start_pos: Position, end_pos: Position, details: str):
-		super().__init__(start_pos, end_pos, "UnexpectedCharacter", details)
+	__slots__ = ()
+
+	def __init__(self, pos: Position, details: str):
+		super().__init__(pos, pos, "UnexpectedCharacter", details)
 
 
 class InvalidSyntax(Error):
+	__slots__ = ()
+
 	def __init__(self, start_pos: Position, end_pos: Position, details: str):
 		super().__init__(start_pos, end_pos, "InvalidSyntax", details)
 
 
 class UnknownTag(Error):
+	__slots__ = ()
+
 	def __init__(self, start_pos, end_pos, details):
 		super().__init__(start_pos, end_pos, "UnknownTag", details)
 
 
 class MissingAttribute(Error):
+	__slots__ = ()
+
 	def __init__(self, start_pos, end_pos, details):
 		super().__init__(start_pos, end_pos, "MissingAttribute", details)
 
 
+class CompileError(Exception):
+	"""Raised by the Lexer, Parser or Compiler to abort processing with an Error."""
+
+	def __init__(self, error: Error):
+		super().__init__(error)
+		self.error = error
+
+
 class Result:
 	def __init__(self):
 		self.value = None
 		self.error: Error | None = None
 
-	def register(self, res: Self):
-		if res.error:
-			self.error = res.error
-		return res.value
-
 	def success(self, value):
 		self.value = value
 		return self
@@ -136,74 +152,189 @@ class Lexer:
 	def __init__(self, fn: str, ftxt: str):
 		self.fn = fn
 		self.ftxt = ftxt
-
-		self.pos = Position(-1, 0, -1, fn, ftxt)
-		self.current_char: str | None = None
+		# Lexing stops at end; markdown content is lexed in place by
+		# temporarily narrowing it to the end of the content.
+		self.end: int = len(ftxt)
+
+		# The cursor is kept as plain ints; immutable Positions are only
+		# built (by snapshot) when a token or error needs one.
+		self.idx: int = -1
+		self.ln: int = 0
+		self.col: int = -1
+		self.current_char: str = EOF_CHAR
 		self.advance()
 
 	def advance(self):
-		self.pos.advance(self.current_char)
-		self.current_char = (
-			self.ftxt[self.pos.idx] if self.pos.idx < len(self.ftxt) else None
-		)
+		self.idx += 1
+		self.col += 1
+		if self.current_char == "\n":
+			self.col = 0
+			self.ln += 1
+		self.current_char = self.ftxt[self.idx] if self.idx < self.end else EOF_CHAR
+
+	def snapshot(self) -> Position:
+		return Position(self.idx, self.ln, self.col, self.fn, self.ftxt)
+
+	def restore(self, pos: Position):
+		# Move the cursor back (or forward) to a previous snapshot.
+		self.idx, self.ln, self.col = pos.idx, pos.ln, pos.col
+		self.current_char = self.ftxt[self.idx] if self.idx < self.end else EOF_CHAR
+
+	def jump_to(self, idx: int):
+		# Move straight to idx, working out the line and column from the
+		# skipped text instead of advancing one character at a time.
+		newlines: int = self.ftxt.count("\n", self.idx, idx)
+		if newlines:
+			self.ln += newlines
+			self.col = idx - self.ftxt.rfind("\n", 0, idx) - 1
+		else:
+			self.col += idx - self.idx
+		self.idx = idx
+		self.current_char = self.ftxt[idx] if idx < self.end else EOF_CHAR
+
+	def scan(self, pattern: re.Pattern) -> str:
+		# Consume the (possibly empty) run matched by pattern and return it.
+		start: int = self.idx
+		end: int = pattern.match(self.ftxt, start, self.end).end()
+		self.jump_to(end)
+		return self.ftxt[start:end]
 
 	def skip_whitespace(self):
-		while self.current_char is not None and self.current_char in " \t\n":
-			self.advance()
+		if self.current_char in WHITESPACE:
+			self.scan(WHITESPACE_RUN)
 
 	def lex(self):
 		tokens: list[Token] = []
-		res = Result()
 
-		asterisk_mds: list[str] = ["i", "b", "bi"]
+		self.lex_into(tokens)
+
+		end_pos: Position = self.snapshot()
+		tokens.append(Token(end_pos, end_pos, TT.EOF))
+		return tokens
+
+	def lex_span(self, end: int, tokens: list[Token]):
+		# Lex the markdown content between the cursor and end into tokens,
+		# then carry on from end with the outer limit restored.
+		outer_end: int = self.end
+		self.end = end
+		self.current_char = self.ftxt[self.idx] if self.idx < end else EOF_CHAR
+
+		self.lex_into(tokens)
+
+		self.end = outer_end
+		self.current_char = self.ftxt[self.idx] if self.idx < outer_end else EOF_CHAR
+
+	def lex_md_run(
+		self,
+		tokens: list[Token],
+		start_pos: Position,
+		marker: str,
+		tag_names: tuple[str, ...],
+		content_run: re.Pattern,
+		terminated: bool,
+	):
+		# '#' runs wrap the rest of the line, '*' runs wrap the text up to a
+		# matching (terminated) run of '*'.
+		count: int = 0
+		while self.current_char == marker:
+			count += 1
+			self.advance()
+		self.scan(INLINE_WHITESPACE_RUN)
+
+		if count > 3:
+			raise CompileError(
+				InvalidSyntax(
+					start_pos,
+					self.snapshot(),
+					f"Expected a max of 3 '{marker}' characters.",
+				)
+			)
+
+		content_start_pos: Position = self.snapshot()
+		content_end: int = content_run.match(self.ftxt, self.idx, self.end).end()
+		self.jump_to(content_end)
 
-		while self.current_char is not None:
-			start_pos: Position = self.pos.copy()
-			attributes: dict[str, str] = {}
+		if content_end == content_start_pos.idx:
+			raise CompileError(
+				InvalidSyntax(
+					content_start_pos,
+					self.snapshot(),
+					f"Expected content after '{marker * count}'.",
+				)
+			)
+
+		if terminated:
+			if self.current_char in ("\n", EOF_CHAR):
+				pos: Position = self.snapshot()
+				raise CompileError(
+					InvalidSyntax(
+						pos,
+						pos,
+						"Reached EOL when parsing Markdown tag.",
+					)
+				)
 
-			if self.current_char in " \t\n":
+			end_count: int = 0
+			while self.current_char == marker:
+				end_count += 1
 				self.advance()
 
-			elif self.current_char == "<":
+			if end_count != count:
+				pos = self.snapshot()
+				raise CompileError(
+					InvalidSyntax(
+						pos,
+						pos,
+						f"Expected {count} '{marker}' characters, got {end_count} '{marker}' characters instead.",
+					)
+				)
+
+		# The content is only lexed once the run around it checks out.
+		after_pos: Position = self.snapshot()
+		tokens.append(Token(start_pos, content_start_pos, TT.TAG, tag_names[count - 1]))
+		self.restore(content_start_pos)
+		self.lex_span(content_end, tokens)
+		self.restore(after_pos)
+		tokens.append(Token(after_pos, after_pos, TT.CLOSE, tag_names[count - 1]))
+
+	def lex_into(self, tokens: list[Token]):
+		while self.idx < self.end:
+			if self.current_char in WHITESPACE:
+				self.skip_whitespace()
+				continue
+
+			start_pos: Position = self.snapshot()
+
+			if self.current_char == "<":
 				self.advance()
 				self.skip_whitespace()
 				is_closing_tag = False
-				tag_name: str = ""
 
 				if self.current_char == "/":
 					is_closing_tag = True
 					self.advance()
 
 				if self.current_char not in LETTERS:
-					return res.fail(
+					raise CompileError(
 						ExpectedCharacter(
-							self.pos.copy(),
-							self.pos.copy(),
+							self.snapshot(),
 							"Expected a letter after '"
 							+ ("</" if is_closing_tag else "<")
 							+ "'",
 						)
 					)
-				tag_name += self.current_char
-				self.advance()
-
-				while (
-					self.current_char is not None
-					and self.current_char in LETTERS_DIGITS
-				):
-					tag_name += self.current_char
-					self.advance()
+				tag_name: str = self.scan(TAG_NAME_RUN)
 
 				# Check tag name
 				if tag_name not in VALID_TAGS:
-					return res.fail(UnknownTag(start_pos, self.pos.copy(), tag_name))
+					raise CompileError(UnknownTag(start_pos, self.snapshot(), tag_name))
 
+				attributes: dict[str, str] = {}
 				if self.current_char != ">":  # Attributes
-					if self.current_char not in " \t\n":
-						return res.fail(
+					if self.current_char not in WHITESPACE:
+						raise CompileError(
 							ExpectedCharacter(
-								self.pos.copy(),
-								self.pos.copy(),
+								self.snapshot(),
 								"Expected '>' or a whitespace after tag name.",
 							)
 						)
@@ -211,49 +342,37 @@ class Lexer:
 					# maps attribute to values
 					self.skip_whitespace()
 
-					while self.current_char is not None and self.current_char != ">":
-						attribute: str = ""
-						data: str = ""
-						while (
-							self.current_char is not None
-							and self.current_char in LETTERS
-						):
-							attribute += self.current_char
-							self.advance()
+					while self.idx < self.end and self.current_char != ">":
+						attribute: str = self.scan(ATTRIBUTE_RUN)
 
 						self.skip_whitespace()
 						if self.current_char != "=":
-							return res.fail(
+							found: str = (
+								f"'{self.current_char}'" if self.idx < self.end else "EOF"
+							)
+							raise CompileError(
 								ExpectedCharacter(
-									self.pos.copy(),
-									self.pos.copy(),
-									f"Expected '=' after attribute, found '{self.current_char}' instead.",
+									self.snapshot(),
+									f"Expected '=' after attribute, found {found} instead.",
 								)
 							)
 						self.advance()
 						self.skip_whitespace()
 
 						if self.current_char != '"':
-							return res.fail(
+							raise CompileError(
 								ExpectedCharacter(
-									self.pos.copy(),
-									self.pos.copy(),
+									self.snapshot(),
 									"Expected '\"' after '='.",
 								)
 							)
 						self.advance()
-						while (
-							self.current_char is not None
-							and self.current_char not in '"\n'
-						):
-							data += self.current_char
-							self.advance()
+						data: str = self.scan(STRING_RUN)
 
 						if self.current_char != '"':
-							return res.fail(
+							raise CompileError(
 								ExpectedCharacter(
-									self.pos.copy(),
-									self.pos.copy(),
+									self.snapshot(),
 									"Expected terminating '\"' character.",
 								)
 							)
@@ -262,178 +381,50 @@ class Lexer:
 						self.advance()
 						self.skip_whitespace()
 
-				tokens.append(
-					Token(
-						start_pos,
-						self.pos.copy(),
-						TT.CLOSE if is_closing_tag else TT.TAG,
-						tag_name,
+				if is_closing_tag:
+					if attributes:
+						raise CompileError(
+							InvalidSyntax(
+								start_pos,
+								self.snapshot(),
+								"Closing tags cannot have attributes.",
+							)
+						)
+					tokens.append(Token(start_pos, self.snapshot(), TT.CLOSE, tag_name))
+				else:
+					tokens.append(
+						Token(start_pos, self.snapshot(), TT.TAG, tag_name, attributes)
 					)
-				)
-				for attr in attributes.keys():
-					tokens.append(Token(None, None, TT.ATTRIBUTE, attr))
-					tokens.append(Token(None, None, TT.DATA, attributes[attr]))
 
 				self.advance()
 
 			elif self.current_char == '"':
 				self.advance()
-				data: str = ""
-				while self.current_char is not None and self.current_char not in '"\n':
-					data += self.current_char
-					self.advance()
+				data = self.scan(STRING_RUN)
 
 				if self.current_char != '"':
-					return res.fail(
+					raise CompileError(
 						ExpectedCharacter(
-							self.pos.copy(),
-							self.pos.copy(),
+							self.snapshot(),
 							"Expected terminating '\"' character.",
 						)
 					)
-				tokens.append(Token(start_pos, self.pos.copy(), TT.DATA, data))
+				tokens.append(Token(start_pos, self.snapshot(), TT.DATA, data))
 				self.advance()
 
 			elif self.current_char == "#":
-				count: int = 0
-				while self.current_char == "#":
-					count += 1
-					self.advance()
-				while self.current_char is not None and self.current_char in " \t":
-					self.advance()
-
-				if count > 3:
-					return res.fail(
-						InvalidSyntax(
-							start_pos,
-							self.pos.copy(),
-							"Expected a max of 3 '#' characters.",
-						)
-					)
-
-				content_start_pos: Position = self.pos.copy()
-				content: str = ""
-
-				while self.current_char is not None and self.current_char != "\n":
-					content += self.current_char
-					self.advance()
-
-				if not content:
-					return res.fail(
-						InvalidSyntax(
-							content_start_pos,
-							self.pos.copy(),
-							f"Expected content after '{'#' * count}'.",
-						)
-					)
-
-				content_lexer = Lexer("<md-content>", content)
-				content_tokens: list[Token] = res.register(content_lexer.lex())[:-1]
-				if res.error:
-					return res
-
-				for tok in content_tokens:
-					tok.start_pos = content_start_pos
-					tok.end_pos = self.pos.copy()
-
-				tokens.append(Token(start_pos, content_start_pos, TT.TAG, f"h{count}"))
-				tokens.extend(content_tokens)
-				tokens.append(
-					Token(self.pos.copy(), self.pos.copy(), TT.CLOSE, f"h{count}")
-				)
+				self.lex_md_run(tokens, start_pos, "#", HASH_MDS, LINE_RUN, False)
 
 			elif self.current_char == "*":
-				count = 0
-				while self.current_char == "*":
-					count += 1
-					self.advance()
-				while self.current_char is not None and self.current_char in " \t":
-					self.advance()
-
-				if count > 3:
-					return res.fail(
-						InvalidSyntax(
-							start_pos,
-							self.pos.copy(),
-							"Expected a max of 3 '*' characters.",
-						)
-					)
-
-				content_start_pos: Position = self.pos.copy()
-				content: str = ""
-
-				while self.current_char is not None and self.current_char not in "*\n":
-					content += self.current_char
-					self.advance()
-
-				if not content:
-					return res.fail(
-						InvalidSyntax(
-							content_start_pos,
-							self.pos.copy(),
-							f"Expected content after '{'*' * count}'.",
-						)
-					)
-
-				if self.current_char in (None, "\n"):
-					return res.fail(
-						InvalidSyntax(
-							self.pos.copy(),
-							self.pos.copy(),
-							"Reached EOL when parsing Markdown tag.",
-						)
-					)
-
-				end_count: int = 0
-				while self.current_char == "*":
-					end_count += 1
-					self.advance()
-
-				if end_count != count:
-					return res.fail(
-						InvalidSyntax(
-							self.pos.copy(),
-							self.pos.copy(),
-							f"Expected {count} '*' characters, got {end_count} '*' characters instead.",
-						)
-					)
-
-				content_lexer = Lexer("<md-content>", content)
-				content_tokens: list[Token] = res.register(content_lexer.lex())[:-1]
-				if res.error:
-					return res
-
-				for tok in content_tokens:
-					tok.start_pos = content_start_pos
-					tok.end_pos = self.pos.copy()
-
-				tokens.append(
-					Token(start_pos, content_start_pos, TT.TAG, asterisk_mds[count - 1])
-				)
-				tokens.extend(content_tokens)
-				tokens.append(
-					Token(
-						self.pos.copy(),
-						self.pos.copy(),
-						TT.CLOSE,
-						asterisk_mds[count - 1],
-					)
-				)
+				self.lex_md_run(tokens, start_pos, "*", ASTERISK_MDS, ASTERISK_RUN, True)
 
 			else:
-				content: str = ""
-
-				while (
-					self.current_char is not None and self.current_char not in "\n<>\"'"
-				):
-					content += self.current_char
-					self.advance()
+				content: str = self.scan(TEXT_RUN)
 
 				if content == "":
-					return res.fail(
+					raise CompileError(
 						UnexpectedCharacter(
-							self.pos.copy(),
-							self.pos.copy(),
+							self.snapshot(),
 							f"Unexpected Character: '{self.current_char}'",
 						)
 					)
@@ -441,17 +432,16 @@ class Lexer:
 				tokens.append(
 					Token(
 						start_pos,
-						self.pos.copy(),
+						self.snapshot(),
 						TT.TEXT,
 						content,
 					)
 				)
 
-		tokens.append(Token(self.pos.copy(), self.pos.copy(), TT.EOF))
-		return res.success(tokens)
-
 
 class NodeList:
+	__slots__ = ("start_pos", "end_pos", "body")
+
 	def __init__(self, start_pos: Position, end_pos: Position, body: list):
 		self.start_pos = start_pos
 		self.end_pos = end_pos
@@ -462,6 +452,8 @@ class NodeList:
 
 
 class TextNode:
+	__slots__ = ("start_pos", "end_pos", "content")
+
 	def __init__(self, start_pos: Position, end_pos: Position, content: str):
 		self.start_pos = start_pos
 		self.end_pos = end_pos
@@ -472,6 +464,8 @@ class TextNode:
 
 
 class TagNode:
+	__slots__ = ("start_pos", "end_pos", "attributes", "tag_name", "content")
+
 	def __init__(
 		self,
 		start_pos: Position,
@@ -512,14 +506,10 @@ class Parser:
 			self.current_tok = self.tokens[self.token_idx]
 
 	def parse(self):
-		res = Result()
-
-		body = res.register(self.parse_tags())
-		if res.error:
-			return res
+		body = self.parse_tags()
 
 		if self.current_tok.type != TT.EOF:
-			return res.fail(
+			raise CompileError(
 				InvalidSyntax(
 					self.current_tok.start_pos,
 					self.current_tok.end_pos,
@@ -527,32 +517,30 @@ class Parser:
 				)
 			)
 
-		return res.success(body)
+		return body
 
-	def parse_tags(self):
-		res = Result()
+	def parse_tags(self, coalesce: bool = False):
 		body: list = []
 		start_pos: Position = self.current_tok.start_pos
 		end_pos: Position = self.current_tok.end_pos
 
 		while self.current_tok.type not in (TT.CLOSE, TT.EOF):
-			tag: TagNode | TextNode = res.register(self.parse_tag())
-			if res.error:
-				return res
+			tag: TagNode | TextNode = self.parse_tag()
 			end_pos = tag.end_pos
 
 			body.append(tag)
 
-		return res.success(NodeList(start_pos, end_pos, body))
+		# A tag's content is usually a single node; hand it back unwrapped.
+		if coalesce and len(body) == 1:
+			return body[0]
+		return NodeList(start_pos, end_pos, body)
 
 	def parse_tag(self):
-		res = Result()
-
 		if self.current_tok.type == TT.TEXT:
 			return self.parse_text()
 
 		if self.current_tok.type != TT.TAG:
-			return res.fail(
+			raise CompileError(
 				InvalidSyntax(
 					self.current_tok.start_pos,
 					self.current_tok.end_pos,
@@ -561,49 +549,40 @@ class Parser:
 			)
 		start_pos: Position = self.current_tok.start_pos
 		tag_name: str = self.current_tok.value
+		# Markdown tags carry no attributes.
+		attributes: dict[str, str] = self.current_tok.attributes or {}
 		self.advance()
 
-		attributes: dict[str, str] = {}
-
-		while self.current_tok.type == TT.ATTRIBUTE:
-			attribute = self.current_tok.value
-			self.advance()
-			data = self.current_tok.value
-			self.advance()
-
-			attributes[attribute] = data
-
-		content = res.register(self.parse_tags())
-		if res.error:
-			return res
+		content = self.parse_tags(coalesce=True)
 
-		if self.current_tok != Token(None, None, TT.CLOSE, tag_name):
-			return res.fail(
+		tok: Token = self.current_tok
+		if tok.type is not TT.CLOSE or tok.value != tag_name:
+			raise CompileError(
 				InvalidSyntax(
-					self.current_tok.start_pos,
-					self.current_tok.end_pos,
-					f"Expected </{tag_name}>, found token {self.current_tok} instead.",
+					tok.start_pos,
+					tok.end_pos,
+					f"Expected </{tag_name}>, found token {tok} instead.",
 				)
 			)
-		end_pos: Position = self.current_tok.end_pos
+		end_pos: Position = tok.end_pos
 		self.advance()
 
-		return res.success(TagNode(start_pos, end_pos, attributes, tag_name, content))
+		return TagNode(start_pos, end_pos, attributes, tag_name, content)
 
 	def parse_text(self):
-		res = Result().success(
-			TextNode(
-				self.current_tok.start_pos,
-				self.current_tok.end_pos,
-				self.current_tok.value,
-			)
+		node = TextNode(
+			self.current_tok.start_pos,
+			self.current_tok.end_pos,
+			self.current_tok.value,
 		)
 		self.advance()
 
-		return res
+		return node
 
 
 class Window:
+	__slots__ = ("x", "y", "width", "height", "title", "contents", "styles")
+
 	def __init__(self, x: int, y: int, width: int, height: int, title: str):
 		self.x = x
 		self.y = y
@@ -626,7 +605,9 @@ class Window:
 
 
 class Text:
-	def __init__(self, contents: str):
+	__slots__ = ("contents", "styles")
+
+	def __init__(self, contents: Any):
 		self.contents = contents
 		self.styles: dict[str, Any] = {}
 
@@ -635,6 +616,8 @@ class Text:
 
 
 class Header:
+	__slots__ = ("header_type", "contents", "styles")
+
 	def __init__(self, header_type: int, contents: list):
 		self.header_type = header_type
 		self.contents = contents
@@ -646,6 +629,8 @@ class Header:
 
 
 class StyledContent:
+	__slots__ = ("style", "contents", "styles")
+
 	def __init__(self, style: str, contents: list):
 		self.style = style
 		self.contents = contents
@@ -657,6 +642,8 @@ class StyledContent:
 
 
 class Rect:
+	__slots__ = ("x", "y", "width", "height", "contents", "styles")
+
 	def __init__(self, x: int, y: int, width: int, height: int):
 		self.x = x
 		self.y = y
@@ -671,6 +658,8 @@ class Rect:
 
 
 class Circle:
+	__slots__ = ("x", "y", "radius", "contents", "styles")
+
 	def __init__(self, x: int, y: int, radius: int):
 		self.x = x
 		self.y = y
@@ -684,6 +673,8 @@ class Circle:
 
 
 class Line:
+	__slots__ = ("start_x", "start_y", "end_x", "end_y", "contents", "styles")
+
 	def __init__(self, start_x: int, start_y: int, end_x: int, end_y: int):
 		self.start_x = start_x
 		self.start_y = start_y
@@ -698,6 +689,8 @@ class Line:
 
 
 class Div:
+	__slots__ = ("contents", "styles")
+
 	def __init__(self, contents: list):
 		self.contents = contents
 		self.styles: dict[str, Any] = {}
@@ -711,14 +704,36 @@ class Compiler:
 		self.window = None
 		CLASSES.clear()
 		IDS.clear()
+		ID_NAMES.clear()
+		NODE_CLASSES.clear()
 
 		self.styles: list[str] = []
 
-	def validate(self, node_list: NodeList):
-		res = Result()
+		self.visitors: dict[type, Any] = {
+			NodeList: self.visitNodeList,
+			TextNode: self.visitTextNode,
+			TagNode: self.visitTagNode,
+		}
+		self.tag_handlers: dict[str, Any] = {
+			"window": self._h_window,
+			"text": self._h_text,
+			"rect": self._h_rect,
+			"circle": self._h_circle,
+			"line": self._h_line,
+			"div": self._h_div,
+			"include": self._h_include,
+			"h1": self._h_header,
+			"h2": self._h_header,
+			"h3": self._h_header,
+			"b": self._h_styled,
+			"i": self._h_styled,
+			"bi": self._h_styled,
+			"u": self._h_styled,
+		}
 
+	def validate(self, node_list: NodeList):
 		if len(node_list.body) != 1:
-			return res.fail(
+			raise CompileError(
 				Error(
 					node_list.start_pos,
 					node_list.end_pos,
@@ -731,7 +746,7 @@ class Compiler:
 			not isinstance(node_list.body[0], TagNode)
 			or node_list.body[0].tag_name != "window"
 		):
-			return res.fail(
+			raise CompileError(
 				Error(
 					node_list.start_pos,
 					node_list.end_pos,
@@ -740,29 +755,26 @@ class Compiler:
 				)
 			)
 
-		return res.success(True)
-
 	def visit(self, node):
-		method_name: str = f"visit{type(node).__name__}"
-		method = getattr(self, method_name, self.no_visit_method)
-		return method(node)
+		return self.visitors.get(type(node), self.no_visit_method)(node)
 
 	def no_visit_method(self, node):
-		return Result().fail(f"No visit{type(node).__name__} method defined.")
+		raise CompileError(
+			Error(
+				node.start_pos,
+				node.end_pos,
+				"CompileError",
+				f"No visit{type(node).__name__} method defined.",
+			)
+		)
 
 	def visitNodeList(self, node: NodeList):
-		res = Result()
-		registered = None
 		results = []
 
 		for stmt in node.body:
-			registered = res.register(self.visit(stmt))
-			if res.error:
-				return res
-
-			results.append(registered)
+			results.append(self.visit(stmt))
 
-		return res.success(results)
+		return results
 
 	def visitTextNode(self, node: TextNode):
 		return self.visitTagNode(
@@ -770,279 +782,290 @@ class Compiler:
 		)
 
 	def visitTagNode(self, node: TagNode):
-		res = Result()
+		handler = self.tag_handlers.get(node.tag_name)
+		if handler is None:
+			raise CompileError(
+				UnknownTag(
+					node.start_pos,
+					node.end_pos,
+					f"<{node.tag_name}> (when compiling)",
+				)
+			)
+		return handler(node)
+
+	def visit_nested(self, node: TagNode):
+		# Children append themselves to window.contents; give them a scratch
+		# list so only the container that wraps them ends up in the window.
+		contents: list = self.window.contents
+		self.window.contents = []
+		if type(node.content) is NodeList:
+			result = self.visitNodeList(node.content)
+		else:
+			result = [self.visit(node.content)]
+		self.window.contents = contents
+		return result
 
-		def update_class_and_id(obj) -> None:
-			if "class" in node.attributes:
-				class_name: str = node.attributes["class"]
-				if class_name in CLASSES:
-					CLASSES[class_name].append(obj)
-				else:
-					CLASSES[class_name] = [obj]
-			if "id" in node.attributes:
-				id_name: str = node.attributes["id"]
-				if id_name in IDS.values():
-					return res.fail(
-						f"ID {id_name} is already used by object {type(IDS[id_name]).__name__}."
-					)
-				else:
-					IDS[obj] = id_name
-
-		match node.tag_name:
-
-			case "window":
-				# read window attributes
-				window_x: int = int(node.attributes.get("x", 45))
-				window_y: int = int(node.attributes.get("y", 35))
-				window_width: int = int(node.attributes.get("width", 30))
-				window_height: int = int(node.attributes.get("height", 20))
-				window_title: str = node.attributes.get("title", "Title")
-
-				if self.window is not None:
-					return res.fail(
-						Error(
-							node.start_pos,
-							node.end_pos,
-							"WindowError",
-							"There can only be one.",
-						)
+	def update_class_and_id(self, node: TagNode, obj) -> None:
+		if "class" in node.attributes:
+			class_name: str = node.attributes["class"]
+			if class_name in CLASSES:
+				CLASSES[class_name].append(obj)
+			else:
+				CLASSES[class_name] = [obj]
+			NODE_CLASSES.setdefault(id(obj), []).append(class_name)
+		if "id" in node.attributes:
+			id_name: str = node.attributes["id"]
+			if id_name in ID_NAMES:
+				raise CompileError(
+					Error(
+						node.start_pos,
+						node.end_pos,
+						"IDError",
+						f"ID {id_name} is already used by object {type(ID_NAMES[id_name]).__name__}.",
 					)
-
-				self.window = Window(
-					window_x, window_y, window_width, window_height, window_title
 				)
+			IDS[obj] = id_name
+			ID_NAMES[id_name] = obj
+
+	def _h_window(self, node: TagNode):
+		# read window attributes
+		window_x: int = int(node.attributes.get("x", 45))
+		window_y: int = int(node.attributes.get("y", 35))
+		window_width: int = int(node.attributes.get("width", 30))
+		window_height: int = int(node.attributes.get("height", 20))
+		window_title: str = node.attributes.get("title", "Title")
+
+		if self.window is not None:
+			raise CompileError(
+				Error(
+					node.start_pos,
+					node.end_pos,
+					"WindowError",
+					"There can only be one.",
+				)
+			)
 
-				res.register(self.visit(node.content))
-				if res.error:
-					return res
-
-				return res.success(self.window)
-
-			case "text":
-				text = Text(node.content)
-				self.window.contents.append(text)
-				update_class_and_id(text)
-
-				return res.success(text)
-
-			case "rect":
-				# read rect attributes
-				rect_x: int = int(node.attributes.get("x", self.window.width // 2 - 5))
-				rect_y: int = int(node.attributes.get("y", self.window.height // 2 - 3))
-				rect_width: int = int(node.attributes.get("width", 10))
-				rect_height: int = int(node.attributes.get("height", 6))
-
-				rect = Rect(rect_x, rect_y, rect_width, rect_height)
-				self.window.contents.append(rect)
-				update_class_and_id(rect)
-
-				return res.success(rect)
-
-			case "circle":
-				# read rect attributes
-				circle_x: int = int(node.attributes.get("x", self.window.width // 2))
-				circle_y: int = int(node.attributes.get("y", self.window.height // 2))
-				circle_radius: int = int(node.attributes.get("radius", 4))
-
-				circle = Circle(circle_x, circle_y, circle_radius)
-				self.window.contents.append(circle)
-				update_class_and_id(circle)
-
-				return res.success(circle)
-
-			case "line":
-				# read line attributes
-				for attr in ("startx", "starty", "endx", "endy"):
-					if attr not in node.attributes.keys():
-						return res.fail(
-							MissingAttribute(
-								node.start_pos,
-								node.end_pos,
-								f"Missing attribute: '{attr}'",
-							)
-						)
+		self.window = Window(
+			window_x, window_y, window_width, window_height, window_title
+		)
 
-				start_x: int = int(node.attributes["startx"])
-				start_y: int = int(node.attributes["starty"])
-				end_x: int = int(node.attributes["endx"])
-				end_y: int = int(node.attributes["endy"])
+		self.visit(node.content)
 
-				line = Line(start_x, start_y, end_x, end_y)
-				self.window.contents.append(line)
-				update_class_and_id(line)
+		return self.window
 
-				return res.success(line)
+	def _h_text(self, node: TagNode):
+		text = Text(node.content)
+		self.window.contents.append(text)
+		self.update_class_and_id(node, text)
 
-			case "div":
-				start_pos: int = len(self.window.contents)
+		return text
 
-				content = res.register(self.visit(node.content))
-				if res.error:
-					return res
+	def _h_rect(self, node: TagNode):
+		# read rect attributes
+		rect_x: int = int(node.attributes.get("x", self.window.width // 2 - 5))
+		rect_y: int = int(node.attributes.get("y", self.window.height // 2 - 3))
+		rect_width: int = int(node.attributes.get("width", 10))
+		rect_height: int = int(node.attributes.get("height", 6))
 
-				self.window.contents = self.window.contents[:start_pos]
+		rect = Rect(rect_x, rect_y, rect_width, rect_height)
+		self.window.contents.append(rect)
+		self.update_class_and_id(node, rect)
 
-				div = Div(content)
-				self.window.contents.append(div)
-				update_class_and_id(div)
+		return rect
 
-				return res.success(div)
+	def _h_circle(self, node: TagNode):
+		# read rect attributes
+		circle_x: int = int(node.attributes.get("x", self.window.width // 2))
+		circle_y: int = int(node.attributes.get("y", self.window.height // 2))
+		circle_radius: int = int(node.attributes.get("radius", 4))
 
-			case "include":
-				if "as" not in node.attributes:
-					return res.fail(
-						MissingAttribute(
-							node.start_pos,
-							node.end_pos,
-							f"Missing attribute: 'as'",
-						)
-					)
-				if node.attributes["as"] not in VALID_INCLUDES:
-					return res.fail(
-						Error(
-							node.start_pos,
-							node.end_pos,
-							"AttributeError",
-							f"Expected one of the following for 'as' attribute: {", ".join(VALID_INCLUDES)}.",
-						)
-					)
+		circle = Circle(circle_x, circle_y, circle_radius)
+		self.window.contents.append(circle)
+		self.update_class_and_id(node, circle)
 
-				if not node.content:
-					return res.fail(
-						MissingAttribute(
-							node.start_pos, node.end_pos, "File path cannot be empty."
-						)
-					)
+		return circle
 
-				if not exists(f"EmeraldOS/files/{node.content.body[0].content}"):
-					return res.fail(
-						Error(
-							node.start_pos,
-							node.end_pos,
-							"FileError",
-							f"Cannot find file {node.content}.",
-						)
+	def _h_line(self, node: TagNode):
+		# read line attributes
+		for attr in ("startx", "starty", "endx", "endy"):
+			if attr not in node.attributes.keys():
+				raise CompileError(
+					MissingAttribute(
+						node.start_pos,
+						node.end_pos,
+						f"Missing attribute: '{attr}'",
 					)
+				)
 
-				def check_extension(file_ext: str, file_type: str) -> Result:
-					local_res = Result()
-					if not node.content.body[0].content.endswith(file_ext):
-						return local_res.fail(
-							Error(
-								node.start_pos,
-								node.end_pos,
-								"FileError",
-								f"{file_type} must end in '{file_ext}'.",
-							)
-						)
-					return local_res.success(None)
+		start_x: int = int(node.attributes["startx"])
+		start_y: int = int(node.attributes["starty"])
+		end_x: int = int(node.attributes["endx"])
+		end_y: int = int(node.attributes["endy"])
 
-				match node.attributes["as"]:
-					case "style":
-						res.register(check_extension(".gms", "Stylesheet"))
-						self.styles.append(node.content)
-					case "md":
-						res.register(check_extension(".md", "Markdown file"))
+		line = Line(start_x, start_y, end_x, end_y)
+		self.window.contents.append(line)
+		self.update_class_and_id(node, line)
 
-				if res.error:
-					return res
+		return line
 
-				return res.success(None)
+	def _h_div(self, node: TagNode):
+		content = self.visit_nested(node)
 
-			case _:
-				if node.tag_name in ("h1", "h2", "h3"):
-					start_pos: int = len(self.window.contents)
+		div = Div(content)
+		self.window.contents.append(div)
+		self.update_class_and_id(node, div)
 
-					content = res.register(self.visit(node.content))
-					if res.error:
-						return res
+		return div
 
-					self.window.contents = self.window.contents[:start_pos]
+	def _h_include(self, node: TagNode):
+		if "as" not in node.attributes:
+			raise CompileError(
+				MissingAttribute(
+					node.start_pos,
+					node.end_pos,
+					f"Missing attribute: 'as'",
+				)
+			)
+		if node.attributes["as"] not in VALID_INCLUDES:
+			raise CompileError(
+				Error(
+					node.start_pos,
+					node.end_pos,
+					"AttributeError",
+					f"Expected one of the following for 'as' attribute: {', '.join(VALID_INCLUDES)}.",
+				)
+			)
 
-					header = Header(int(node.tag_name[1]), content)
-					self.window.contents.append(header)
-					update_class_and_id(header)
+		if not isinstance(node.content, TextNode):
+			raise CompileError(
+				MissingAttribute(
+					node.start_pos, node.end_pos, "File path cannot be empty."
+				)
+			)
+		path: str = node.content.content
 
-					return res.success(header)
+		if not exists(f"EmeraldOS/files/{path}"):
+			raise CompileError(
+				Error(
+					node.start_pos,
+					node.end_pos,
+					"FileError",
+					f"Cannot find file {path}.",
+				)
+			)
+
+		def check_extension(file_ext: str, file_type: str) -> None:
+			if not path.endswith(file_ext):
+				raise CompileError(
+					Error(
+						node.start_pos,
+						node.end_pos,
+						"FileError",
+						f"{file_type} must end in '{file_ext}'.",
+					)
+				)
 
-				if node.tag_name in ("b", "i", "bi", "u"):
-					start_pos: int = len(self.window.contents)
+		match node.attributes["as"]:
+			case "style":
+				check_extension(".gms", "Stylesheet")
+				self.styles.append(path)
+			case "md":
+				check_extension(".md", "Markdown file")
 
-					content = res.register(self.visit(node.content))
-					if res.error:
-						return res
+		return None
 
-					self.window.contents = self.window.contents[:start_pos]
+	def _h_header(self, node: TagNode):
+		content = self.visit_nested(node)
 
-					styled_content = StyledContent(node.tag_name, content)
-					self.window.contents.append(styled_content)
-					update_class_and_id(styled_content)
+		header = Header(int(node.tag_name[1]), content)
+		self.window.contents.append(header)
+		self.update_class_and_id(node, header)
 
-					return res.success(styled_content)
+		return header
 
-				return res.fail(
-					UnknownTag(
-						node.start_pos,
-						node.end_pos,
-						f"<{node.tag_name}> (when compiling)",
-					)
-				)
+	def _h_styled(self, node: TagNode):
+		content = self.visit_nested(node)
+
+		styled_content = StyledContent(node.tag_name, content)
+		self.window.contents.append(styled_content)
+		self.update_class_and_id(node, styled_content)
+
+		return styled_content
+
+
+# Stylesheet tag selector for each model class.
+TAG_NAMES: dict[type, str] = {
+	cls: cls.__name__.lower()
+	for cls in (Window, Text, Header, StyledContent, Rect, Circle, Line, Div)
+}
+
+
+def index_selectors(
+	styles: dict[str, dict[str, list]]
+) -> tuple[list, dict[str, list[int]], dict[str, list[int]], dict[str, list[int]]]:
+	# Split every selector once and bucket the position of its style under
+	# each tag, id and class it names, so nodes can look their styles up.
+	ordered: list = list(styles.values())
+	tag_map: dict[str, list[int]] = {}
+	id_map: dict[str, list[int]] = {}
+	class_map: dict[str, list[int]] = {}
+
+	for order, selectors in enumerate(styles):
+		for selector in selectors.split(" "):
+			if selector.startswith("#"):
+				id_map.setdefault(selector[1:], []).append(order)
+			elif selector.startswith("."):
+				class_map.setdefault(selector[1:], []).append(order)
+			else:
+				tag_map.setdefault(selector, []).append(order)
+
+	return ordered, tag_map, id_map, class_map
 
 
 def apply_cascading_styles(
-	styles: dict[str, dict[str, list]], node: Any, parent: Any = None
+	styles: dict[str, dict[str, list]],
+	node: Any,
+	parent: Any = None,
+	index: tuple | None = None,
 ):
+	if index is None:
+		index = index_selectors(styles)
+	ordered, tag_map, id_map, class_map = index
+
 	if parent:
-		for prop, value in parent.styles.items():
-			node.styles[prop] = value
+		node.styles.update(parent.styles)
 
-	tag_name: str = type(node).__name__.lower()
+	tag_name: str = TAG_NAMES.get(type(node)) or type(node).__name__.lower()
 	node_id = IDS.get(node, None)
-	node_classes = [
-		class_name for class_name, nodes in CLASSES.items() if node in nodes
-	]
-
-	for selectors, style in styles.items():
-		selected: bool = False
-
-		splitted_selectors: list[str] = selectors.split(" ")
 
-		if tag_name in splitted_selectors:
-			selected = True
-		if node_id and "#" + node_id in splitted_selectors:
-			selected = True
-		for class_name in node_classes:
-			if "." + class_name in splitted_selectors:
-				selected = True
+	selected: set[int] = set(tag_map.get(tag_name, ()))
+	if node_id:
+		selected.update(id_map.get(node_id, ()))
+	for class_name in NODE_CLASSES.get(id(node), ()):
+		selected.update(class_map.get(class_name, ()))
 
-		if selected:
-			for prop_key, value in style.items():
-				node.styles[prop_key] = value
+	# Styles are applied in stylesheet order so later rules still win.
+	for order in sorted(selected):
+		node.styles.update(ordered[order])
 
 	if hasattr(node, "contents") and isinstance(node.contents, list):
 		for child in node.contents:
-			apply_cascading_styles(styles, child, node)
+			apply_cascading_styles(styles, child, node, index)
 
 
 def process(fn: str, ftxt: str):
-	lexer = Lexer(fn, ftxt)
-	lex_result: Result = lexer.lex()
-	if lex_result.error:
-		return lex_result
-
-	parser = Parser(lex_result.value)
-	ast = parser.parse()
-	if ast.error:
-		return ast
-
-	compiler = Compiler()
-	validate = compiler.validate(ast.value)
-	if validate.error:
-		return validate
-
-	result = compiler.visit(ast.value)
-	if result.error:
-		return result
+	res = Result()
+
+	try:
+		lexer = Lexer(fn, ftxt)
+		parser = Parser(lexer.lex())
+		ast: NodeList = parser.parse()
+
+		compiler = Compiler()
+		compiler.validate(ast)
+		result = res.success(compiler.visit(ast))
+	except CompileError as e:
+		return res.fail(e.error)
 
 	for style in compiler.styles:
 		with open(f"EmeraldOS/files/{style}", "r") as file:
@@ -1058,7 +1081,7 @@ def process(fn: str, ftxt: str):
 
 if __name__ == "__main__":
 
-	with open("EmeraldOS/files/data.xml", "r") as file:
+	with open("EmeraldOS/files/data.xml", "r", encoding="utf-8") as file:
 		ftxt: str = file.read()
 
 		if ftxt.strip():
@@ -0,0 +1,26 @@
+import os
+
+from setuptools import setup
+
+# GEM_COMPILER=mypyc builds gemSheet with mypyc instead of Cython. The Cython
+# build only covers gemXML: gemSheet's time is spent in the regex engine and
+# in building tokens, and cythonizing it measured no faster than plain Python.
+if os.environ.get("GEM_COMPILER") == "mypyc":
+	from mypyc.build import mypycify
+
+	ext_modules = mypycify(["gemSheet.py"])
+else:
+	try:
+		from Cython.Build import cythonize
+	except ImportError:
+		# Without Cython the modules are installed as plain Python.
+		ext_modules = []
+	else:
+		ext_modules = cythonize(["gemXML.py"], language_level=3)
+
+
+setup(
+	name="GemMarkups",
+	py_modules=["gemSheet", "gemXML", "gemMD"],
+	ext_modules=ext_modules,
+)